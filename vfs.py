@@ -1,11 +1,24 @@
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
-from io import BytesIO
-from struct import pack, unpack
-from typing import Any, BinaryIO, Self, Optional
+from mmap import mmap, ACCESS_READ, PAGESIZE
+from struct import Struct, pack, unpack, unpack_from
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, Self, Optional, TypeVar, cast
 import posixpath as path
 import os
-import zlib
+import shutil
+import tempfile
+
+try:
+	from isal import isal_zlib as zlib
+except ImportError:
+	import zlib
+
+try:
+	from mmap import MADV_WILLNEED
+except ImportError:
+	MADV_WILLNEED = None
 
 __all__: list[str] = [
 	'VFS',
@@ -15,13 +28,25 @@ __all__: list[str] = [
 ]
 
 
+VFILE_STRUCT: Struct = Struct('<6i')
+VDIRECTORY_STRUCT: Struct = Struct('<5i')
+MMAP_THRESHOLD: int = 1 << 20
+MAX_PENDING_JOBS: int = 64
+IGNORED_FILES: frozenset[str] = frozenset({'.DS_Store', 'Thumbs.db'})
+
+
 def hash_name(string: str, do_preceding_path_check: bool = True) -> int:
 	if not string.startswith('/') and do_preceding_path_check:
 		string = '/' + string
 
+	string = string.lower()
+
+	# iterating ascii bytes yields the char codes directly, without ord()
+	codes: Iterable[int] = string.encode() if string.isascii() else map(ord, string)
+
 	hashed: int = 5381
-	for char in string.lower():
-		hashed = ((hashed << 5) + hashed) + ord(char)
+	for code in codes:
+		hashed = ((hashed << 5) + hashed) + code
 
 	return hashed & 0x3FFFFFFF | 0x40000000
 
@@ -30,9 +55,35 @@ def read_int(fp: BinaryIO) -> int:
 	return unpack('<i', fp.read(4))[0]
 
 
-def read_string(fp: BinaryIO) -> str:
-	str_len: int = read_int(fp)
-	return fp.read(str_len).decode()
+def read_fd(fd: int, size: int) -> bytes:
+	# os.read may return less than asked for (e.g. on fuse or network filesystems)
+	data: bytes = os.read(fd, size)
+	while len(data) < size:
+		chunk: bytes = os.read(fd, size - len(data))
+		if not chunk:
+			raise Exception(f'file ended after {len(data)} of {size} bytes')
+		data += chunk
+
+	return data
+
+
+def unpack_int(buf: bytes | mmap, offset: int) -> tuple[int, int]:
+	return unpack_from('<i', buf, offset)[0], offset + 4
+
+
+def unpack_string(buf: bytes | mmap, offset: int) -> tuple[str, int]:
+	str_len, offset = unpack_int(buf, offset)
+	return buf[offset:offset + str_len].decode(), offset + str_len
+
+
+def unpack_records(
+	record: Struct,
+	buf: bytes | mmap,
+	offset: int,
+	count: int
+) -> Iterator[tuple[int, ...]]:
+	for i in range(count):
+		yield record.unpack_from(buf, offset + i * record.size)
 
 
 def write_int(fp: BinaryIO, val: int) -> None:
@@ -44,7 +95,7 @@ def write_string(fp: BinaryIO, string: str) -> None:
 	fp.write(string.encode())
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class VEntry(ABC):
 	name_hash: int
 	id: int
@@ -57,6 +108,11 @@ class VEntry(ABC):
 	def read(cls, fp: BinaryIO) -> Self:
 		pass
 
+	@classmethod
+	@abstractmethod
+	def unpack(cls, fields: tuple[int, ...]) -> Self:
+		pass
+
 	@property
 	def path(self) -> str:
 		return path.join(
@@ -64,12 +120,16 @@ class VEntry(ABC):
 			self.name
 		)
 
+	@abstractmethod
+	def pack(self) -> bytes:
+		pass
+
 	@abstractmethod
 	def write(self, fp: BinaryIO) -> None:
 		pass
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class VFile(VEntry):
 	compress_type: int
 	offset: int
@@ -77,59 +137,156 @@ class VFile(VEntry):
 
 	@classmethod
 	def read(cls, fp: BinaryIO) -> Self:
+		return cls.unpack(VFILE_STRUCT.unpack(fp.read(VFILE_STRUCT.size)))
+
+	@classmethod
+	def unpack(cls, fields: tuple[int, ...]) -> Self:
+		name_hash, file_id, compress_type, parent_id, offset, size = fields
 		return cls(
-			name_hash=read_int(fp),
-			id=read_int(fp),
-			compress_type=read_int(fp),
-			parent_id=read_int(fp),
-			offset=read_int(fp),
-			size=read_int(fp),
+			name_hash=name_hash,
+			id=file_id,
+			compress_type=compress_type,
+			parent_id=parent_id,
+			offset=offset,
+			size=size,
 			name=None,
 			parent=None
 		)
 
+	def pack(self) -> bytes:
+		return VFILE_STRUCT.pack(
+			self.name_hash,
+			self.id,
+			self.compress_type,
+			self.parent_id,
+			self.offset,
+			self.size
+		)
+
 	def write(self, fp: BinaryIO) -> None:
-		write_int(fp, self.name_hash)
-		write_int(fp, self.id)
-		write_int(fp, self.compress_type)
-		write_int(fp, self.parent_id)
-		write_int(fp, self.offset)
-		write_int(fp, self.size)
+		fp.write(self.pack())
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class VDirectory(VEntry):
 	unk1: int
 	file_id_start: int
-	entries: list[VEntry] = field(repr=False)
+	child_dirs: list['VDirectory'] = field(default_factory=list, repr=False)
+	child_files: list[VFile] = field(default_factory=list, repr=False)
 
 	@classmethod
 	def read(cls, fp: BinaryIO) -> Self:
+		return cls.unpack(VDIRECTORY_STRUCT.unpack(fp.read(VDIRECTORY_STRUCT.size)))
+
+	@classmethod
+	def unpack(cls, fields: tuple[int, ...]) -> Self:
+		name_hash, folder_id, parent_id, unk1, file_id_start = fields
 		return cls(
-			name_hash=read_int(fp),
-			id=read_int(fp),
-			parent_id=read_int(fp),
-			unk1=read_int(fp),
-			file_id_start=read_int(fp),
-			entries=[],
+			name_hash=name_hash,
+			id=folder_id,
+			parent_id=parent_id,
+			unk1=unk1,
+			file_id_start=file_id_start,
 			name=None,
 			parent=None
 		)
 
 	@property
 	def folders(self) -> list[Self]:
-		return [entry for entry in self.entries if isinstance(entry, VDirectory)]
+		return self.child_dirs
 
 	@property
 	def files(self) -> list[VFile]:
-		return [entry for entry in self.entries if isinstance(entry, VFile)]
+		return self.child_files
+
+	@property
+	def entries(self) -> tuple[VEntry, ...]:
+		# children are stored in child_dirs and child_files now, so this is a tuple
+		# to make appending to it fail loudly. assign it or add to those lists instead
+		return (*self.child_dirs, *self.child_files)
+
+	@entries.setter
+	def entries(self, entries: Iterable[VEntry]) -> None:
+		entries = list(entries)
+		self.child_dirs = [entry for entry in entries if isinstance(entry, VDirectory)]
+		self.child_files = [entry for entry in entries if isinstance(entry, VFile)]
+
+	def walk(self) -> Iterator[tuple[Self, str]]:
+		# pre-order, without recursing. each path is joined onto its parent's
+		# instead of walking back up the tree for every folder
+		stack: list[tuple[Self, str]] = [(self, self.path)]
+		while stack:
+			folder, folder_path = stack.pop()
+			yield folder, folder_path
+			stack.extend(
+				(subfolder, path.join(folder_path, subfolder.name))
+				for subfolder in reversed(folder.child_dirs)
+			)
+
+	def pack(self) -> bytes:
+		return VDIRECTORY_STRUCT.pack(
+			self.name_hash,
+			self.id,
+			self.parent_id,
+			self.unk1,
+			self.file_id_start
+		)
 
 	def write(self, fp: BinaryIO) -> None:
-		write_int(fp, self.name_hash)
-		write_int(fp, self.id)
-		write_int(fp, self.parent_id)
-		write_int(fp, self.unk1)
-		write_int(fp, self.file_id_start)
+		fp.write(self.pack())
+
+
+VEntryT = TypeVar('VEntryT', bound=VEntry)
+
+
+def index_by_id(entries: Iterable[VEntryT], count: int) -> list[VEntryT]:
+	# ids run from 0 to count - 1, so entries can be placed directly instead of sorted
+	indexed: list[VEntryT | None] = [None] * count
+	for entry in entries:
+		if not 0 <= entry.id < count:
+			raise Exception(f'entry id {entry.id} is out of range')
+		indexed[entry.id] = entry
+
+	if any(entry is None for entry in indexed):
+		raise Exception('entry ids are not contiguous')
+
+	return cast(list[VEntryT], indexed)
+
+
+def group_by_parent(
+	entries: list[VEntryT],
+	num_parents: int
+) -> tuple[list[list[VEntryT]], list[VEntryT]]:
+	# returns the children of each parent id in their original order, along with
+	# any entries without a parent
+	groups: list[list[VEntryT]] = [[] for _ in range(num_parents)]
+	orphans: list[VEntryT] = []
+	for entry in entries:
+		if entry.parent_id >= num_parents:
+			raise Exception(f'"{entry.name}" has out of range parent id {entry.parent_id}')
+		elif entry.parent_id >= 0:
+			groups[entry.parent_id].append(entry)
+		else:
+			orphans.append(entry)
+
+	return groups, orphans
+
+
+def bounded_map(
+	pool: Executor,
+	fn: Callable[..., Any],
+	*iterables: Iterable[Any]
+) -> Iterator[Any]:
+	# like Executor.map, but inputs are only pulled as results are drained, so at
+	# most MAX_PENDING_JOBS calls (and their results) are held at once
+	pending: deque[Future] = deque()
+	for args in zip(*iterables):
+		if len(pending) >= MAX_PENDING_JOBS:
+			yield pending.popleft().result()
+		pending.append(pool.submit(fn, *args))
+
+	while pending:
+		yield pending.popleft().result()
 
 
 class VFS:
@@ -139,6 +296,8 @@ class VFS:
 		self.folders: list[VDirectory] = []
 		self.files: list[VFile] = []
 		self.fp: BinaryIO | None = None
+		self.mm: mmap | None = None
+		self.view: memoryview | None = None
 		self.name_table_offset: int | None = None
 		self.data_offset: int | None = None
 		self.root_id: int | None = None
@@ -152,6 +311,10 @@ class VFS:
 		self.close()
 
 	def close(self) -> None:
+		if self.view is not None:
+			self.view.release()
+		if self.mm is not None:
+			self.mm.close()
 		if self.fp is not None:
 			self.fp.close()
 
@@ -162,56 +325,72 @@ class VFS:
 		if self.fp.read(4) != b'VFS2':
 			raise Exception('input is not a VFS2 archive')
 
+		# only map once the header is known to be there, empty files can't be mapped
+		self.mm = mmap(self.fp.fileno(), 0, access=ACCESS_READ)
+		self.view = memoryview(self.mm)
+
+		# everything else is unpacked straight from the mapping. unpack_from holds
+		# the buffer only for the duration of each call, so nothing is left
+		# exported to stop close() from unmapping the archive
+		offset: int = 4
+
 		# parse folders
-		num_folders: int = read_int(self.fp)
-		for _ in range(num_folders):
-			self.folders.append(VDirectory.read(self.fp))
-		self.folders.sort(key=lambda f: f.id)
+		num_folders, offset = unpack_int(self.mm, offset)
+		self.folders = index_by_id(
+			map(VDirectory.unpack, unpack_records(VDIRECTORY_STRUCT, self.mm, offset, num_folders)),
+			num_folders
+		)
+		offset += num_folders * VDIRECTORY_STRUCT.size
 
 		# parse files
-		num_files: int = read_int(self.fp)
-		for _ in range(num_files):
-			self.files.append(VFile.read(self.fp))
-		self.files.sort(key=lambda f: f.id)
+		num_files, offset = unpack_int(self.mm, offset)
+		self.files = index_by_id(
+			map(VFile.unpack, unpack_records(VFILE_STRUCT, self.mm, offset, num_files)),
+			num_files
+		)
+		offset += num_files * VFILE_STRUCT.size
 
 		# get offsets
-		self.name_table_offset = read_int(self.fp)
-		self.data_offset = self.fp.tell()
-
-		# parse names
-		self.fp.seek(self.name_table_offset, 0)
+		self.name_table_offset, offset = unpack_int(self.mm, offset)
+		self.data_offset = offset
 
 		# parse file and folder names
-		num_file_names: int = read_int(self.fp)
+		offset = self.name_table_offset
+		num_file_names, offset = unpack_int(self.mm, offset)
 		if num_file_names != num_files:
 			raise Exception('number of file and file names do not match')
 
 		for file in self.files:
-			file.name = read_string(self.fp)
+			file.name, offset = unpack_string(self.mm, offset)
 
-		num_folder_names: int = read_int(self.fp)
+		num_folder_names, offset = unpack_int(self.mm, offset)
 		if num_folder_names != num_folders:
 			raise Exception('number of folder and folder names do not match')
 
 		for folder in self.folders:
-			folder.name = read_string(self.fp)
+			folder.name, offset = unpack_string(self.mm, offset)
 
 		self.set_relations()
 
 	def load_folder(self) -> None:
 		self.root_id = self.add_folder('', -1, 0)
 
-		paths = []
-		for root, dirs, files in os.walk(self.root_folder, topdown=True):
-			paths.append((root, dirs, files))
+		# collect every folder with its relative name first, then sort once by
+		# depth and path so parents are always added before their children
+		paths: list[tuple[list[str], str, list[str], list[str]]] = []
+		for root, folders, files in os.walk(self.root_folder, topdown=True):
+			name: str = os.path.relpath(root, self.root_folder).replace(os.sep, '/')
+			if name == '.':
+				name = ''
 
-		paths.sort(key=lambda t: t[0].count('/'))
+			parts: list[str] = name.split('/')
+			files = [file for file in files if file not in IGNORED_FILES]
+			paths.append((parts, name, sorted(folders), sorted(files)))
 
-		folder_map: dict[str, int] = {'': self.root_id}
-		for root, folders, files in paths:
-			folders.sort(); files.sort()
-			name: str = root.lstrip(self.root_folder).lstrip('/')
+		paths.sort(key=lambda t: (len(t[0]), t[0]))
 
+		folder_map: dict[str, int] = {'': self.root_id}
+		for _, name, folders, files in paths:
 			folder_id: int = folder_map.get(name)
 			for subfolder in folders:
 				subfolder_name: str = path.join(name, subfolder)
@@ -219,7 +398,6 @@ class VFS:
 				folder_map[subfolder_name] = subfolder_id
 
 			for file in files:
-				if file == '.DS_Store': continue
 				file_name: str = path.join(name, file)
 				self.add_file(file, folder_id, hash_name(file_name))
 
@@ -243,7 +421,6 @@ class VFS:
 			parent_id=parent_id,
 			unk1=unk1,
 			file_id_start=-1,
-			entries=[],
 			name=name,
 			parent=None
 		))
@@ -268,28 +445,27 @@ class VFS:
 		return file_id
 
 	def set_relations(self) -> None:
+		num_folders: int = len(self.folders)
+
 		# set folder parents and entries
-		for folder in self.folders:
-			if folder.parent_id >= 0:
-				parent: VDirectory = self.folders[folder.parent_id]
-				folder.parent = parent
-				parent.entries.append(folder)
-			else:
-				self.root_id = folder.id
+		groups, roots = group_by_parent(self.folders, num_folders)
+		for parent, children in zip(self.folders, groups):
+			parent.child_dirs = children
+			for child in children:
+				child.parent = parent
+
+		if roots:
+			self.root_id = roots[-1].id
 
 		# set file parents
-		for file in self.files:
-			if file.parent_id >= 0:
-				parent: VDirectory = self.folders[file.parent_id]
-				if parent.id != file.parent_id:
-					raise Exception(
-						f'"{file.name}" has mismatched parent id: '
-						f'expected {file.parent_id}, but got {parent.id}'
-					)
-				file.parent = parent
-				parent.entries.append(file)
-			else:
-				raise Exception(f'"{file.name}" does not have parent folder')
+		groups, orphans = group_by_parent(self.files, num_folders)
+		if orphans:
+			raise Exception(f'"{orphans[0].name}" does not have parent folder')
+
+		for parent, children in zip(self.folders, groups):
+			parent.child_files = children
+			for child in children:
+				child.parent = parent
 
 	def extract(self) -> None:
 		os.makedirs(self.root_folder, exist_ok=True)
@@ -302,37 +478,66 @@ class VFS:
 		root.name = path.join(self.root_folder, root.name)
 
 		try:
-			self.extract_folder(root)
+			files: list[VFile] = []
+			file_paths: list[str] = []
+			self.extract_folder(root, files, file_paths)
+
+			# visit files in archive order so the data is read sequentially
+			order: list[int] = sorted(range(len(files)), key=lambda i: files[i].offset)
+			files = [files[i] for i in order]
+			file_paths = [file_paths[i] for i in order]
+
+			# zlib and file writes release the gil, so threads scale here. data is
+			# prefetched as jobs are queued so disk reads overlap decompression
+			with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+				jobs = bounded_map(pool, self.extract_file, self.prefetch(files), file_paths)
+				for _ in jobs:
+					pass  # drain results so worker exceptions are raised
 		finally:
 			root.name = old_root_name
 
-	def extract_folder(self, folder: VDirectory) -> None:
-		os.makedirs(folder.path, exist_ok=True)
+	def extract_folder(self, root: VDirectory, files: list[VFile], file_paths: list[str]) -> None:
+		for folder, folder_path in root.walk():
+			os.makedirs(folder_path, exist_ok=True)
+			files.extend(folder.child_files)
+			file_paths.extend(path.join(folder_path, file.name) for file in folder.child_files)
+
+	def prefetch(self, files: Iterable[VFile]) -> Iterator[VFile]:
+		for file in files:
+			if MADV_WILLNEED is not None:
+				start: int = self.data_offset + file.offset
+				aligned_start: int = start - start % PAGESIZE
+				length: int = min(start - aligned_start + file.size + 4, len(self.mm) - aligned_start)
+				self.mm.madvise(MADV_WILLNEED, aligned_start, length)
+
+			yield file
 
-		for file in folder.files:
-			self.fp.seek(self.data_offset + file.offset, 0)
-			decompressed_size: int | None = None
+	def extract_file(self, file: VFile, file_path: str) -> None:
+		start: int = self.data_offset + file.offset
+		decompressed_size: int | None = None
 
-			if file.compress_type > 0:
-				decompressed_size = read_int(self.fp)
+		if file.compress_type > 0:
+			decompressed_size = unpack_from('<i', self.mm, start)[0]
+			start += 4
 
-			data: bytes = self.fp.read(file.size)
+		# zero-copy slice, safe to take from several threads at once. released
+		# on exit so a failed extract can't keep the mapping from closing
+		with self.view[start:start + file.size] as view:
+			data: bytes | memoryview = view
 
 			match file.compress_type:
 				case 0: pass
 				case 2:
-					data = zlib.decompress(data)
+					# the size is known up front, so allocate the output once
+					data = zlib.decompress(data, bufsize=max(decompressed_size, 1))
 					if len(data) != decompressed_size:
 						raise Exception('decompressed size does not match')
 				case _:
 					raise Exception(f'unknown compression type {file.compress_type}')
 
-			with open(file.path, 'wb') as fp:
+			with open(file_path, 'wb') as fp:
 				fp.write(data)
 
-		for subfolder in folder.folders:
-			self.extract_folder(subfolder)
-
 	def compress(self) -> None:
 		self.fp = open(self.file_name, 'wb')
 
@@ -344,65 +549,87 @@ class VFS:
 		root.name = path.join(self.root_folder, root.name)
 
 		try:
-			buf: BytesIO = BytesIO()
-			self.compress_folder(buf, root)
-
-			# write header
-			self.fp.write(b'VFS2')
-
-			# write folder data
-			write_int(self.fp, len(self.folders))
-			for folder in self.folders:
-				folder.write(self.fp)
-
-			# write file data
-			write_int(self.fp, len(self.files))
-			for file in self.files:
-				file.write(self.fp)
-
-			# write and set offsets
-			self.name_table_offset = self.fp.tell() + 4 + buf.getbuffer().nbytes
-			write_int(self.fp, self.name_table_offset)
-			self.data_offset = self.fp.tell()
-
-			# write data
-			buf.seek(0)
-			self.fp.write(buf.read())
-
-			# write file and folder names
-			write_int(self.fp, len(self.files))
-			for file in self.files:
-				write_string(self.fp, file.name)
-
-			write_int(self.fp, len(self.folders))
-			for folder in self.folders:
-				write_string(self.fp, folder.name)
+			# stage compressed data on disk next to the output rather than in memory,
+			# the system temp dir is often tmpfs
+			staging_dir: str = os.path.dirname(os.path.abspath(self.file_name))
+			with tempfile.TemporaryFile(dir=staging_dir) as buf:
+				files: list[VFile] = []
+				file_paths: list[str] = []
+				self.compress_folder(root, files, file_paths)
+
+				# zlib releases the gil, so files are compressed in parallel and
+				# written back in traversal order as they complete
+				with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+					results = bounded_map(pool, self.compress_file, files, file_paths)
+					for file, (decompressed_size, data) in zip(files, results):
+						file.offset = buf.tell()
+						file.size = len(data)
+
+						if decompressed_size is not None:
+							write_int(buf, decompressed_size)
+						buf.write(data)
+
+				# write header
+				self.fp.write(b'VFS2')
+
+				# write folder data
+				write_int(self.fp, len(self.folders))
+				self.fp.write(b''.join(folder.pack() for folder in self.folders))
+
+				# write file data
+				write_int(self.fp, len(self.files))
+				self.fp.write(b''.join(file.pack() for file in self.files))
+
+				# write and set offsets
+				self.name_table_offset = self.fp.tell() + 4 + buf.tell()
+				write_int(self.fp, self.name_table_offset)
+				self.data_offset = self.fp.tell()
+
+				# write data
+				buf.seek(0)
+				shutil.copyfileobj(buf, self.fp, 1 << 20)
+
+				# write file and folder names
+				write_int(self.fp, len(self.files))
+				for file in self.files:
+					write_string(self.fp, file.name)
+
+				write_int(self.fp, len(self.folders))
+				for folder in self.folders:
+					write_string(self.fp, folder.name)
 
 		finally:
 			root.name = old_root_name
 
-	def compress_folder(self, buf: BinaryIO, folder: VDirectory) -> None:
-		for file in folder.files:
-			if folder.file_id_start < 0:
-				folder.file_id_start = file.id
-
-			offset: int = buf.tell()
+	def compress_folder(self, root: VDirectory, files: list[VFile], file_paths: list[str]) -> None:
+		for folder, folder_path in root.walk():
+			if folder.child_files and folder.file_id_start < 0:
+				folder.file_id_start = folder.child_files[0].id
+			files.extend(folder.child_files)
+			file_paths.extend(path.join(folder_path, file.name) for file in folder.child_files)
 
-			with open(file.path, 'rb') as fp:
-				data: bytes = fp.read()
+	def compress_file(self, file: VFile, file_path: str) -> tuple[int | None, bytes]:
+		# bypass the buffered file object: small files are read in a single call
+		# and large ones are mapped so zlib can read them without a copy
+		fd: int = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
 
-			match file.compress_type:
-				case 0:
-					data = data  # pycharm gives me a stern warning without this
-				case 2:
-					write_int(buf, len(data))
-					data = zlib.compress(data, level=1)
-				case _:
-					raise Exception(f'unknown compression type {file.compress_type}')
+		try:
+			size: int = os.fstat(fd).st_size
 
-			buf.write(data)
-			file.offset = offset
-			file.size = len(data)
+			if size >= MMAP_THRESHOLD:
+				with mmap(fd, 0, access=ACCESS_READ) as mm:
+					return self.compress_data(file, mm)
 
-		for subfolder in folder.folders:
-			self.compress_folder(buf, subfolder)
+			return self.compress_data(file, read_fd(fd, size))
+		finally:
+			os.close(fd)
+
+	@staticmethod
+	def compress_data(file: VFile, data: bytes | mmap) -> tuple[int | None, bytes]:
+		match file.compress_type:
+			case 0:
+				return None, bytes(data)
+			case 2:
+				return len(data), zlib.compress(data, level=1)
+			case _:
+				raise Exception(f'unknown compression type {file.compress_type}')